@@ -0,0 +1,624 @@
+"""
+Headless chat API
+
+JSON over HTTP service around ChatbotWorkflow for programmatic clients. Chat
+requests run on a bounded worker pool; once every worker is busy and the queue
+is full, new work is rejected with 503 so a load balancer can retry elsewhere.
+
+Endpoints:
+    POST /sessions                  {"group_id": int} -> {"session_id", "group_id"}
+    POST /sessions/<id>/messages    {"message": str} -> streamed NDJSON events
+    GET  /sessions/<id>/messages    -> {"session_id", "group_id", "messages"}
+    GET  /healthz                   liveness
+    GET  /readyz                    readiness, 503 when saturated or draining
+
+A session id is the graph thread id, prefixed with its group id. Conversations
+are stored by the workflow's checkpointer, so the server can reopen a session
+by id after a restart. The SQLite database is a local file and sessions are
+locked per process, so replicas must not share a database; a load balancer
+should route all requests for a session id to the same replica.
+
+Usage: python src/api.py --port 8000 --workers 4 --max-queue 16
+"""
+
+__date__ = "2025-03-14"
+__author__ = "NedeeshaWeerasuriya"
+__version__ = "0.1"
+
+import argparse
+import json
+import queue
+import re
+import signal
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the worker pool cannot accept more work
+    """
+
+
+class WorkerPool:
+    """
+    Thread pool with a bounded queue that rejects work instead of growing
+
+    Args:
+        max_workers (int): Number of requests processed concurrently
+        max_queue (int): Number of requests allowed to wait for a worker
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16):
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="chat-worker"
+        )
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of running and queued tasks
+        """
+        return self._in_flight
+
+    @property
+    def saturated(self) -> bool:
+        return self._in_flight >= self.capacity
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Submit a task, raising QueueFullError if the pool is at capacity
+        """
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Worker pool is at capacity")
+        with self._lock:
+            self._in_flight += 1
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._release)
+        return future
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+class Session:
+    """
+    A conversation with the chatbot for one Splitwise group. The session id
+    starts with the group id so the session can be reopened from the
+    checkpointer after a restart
+    """
+
+    def __init__(self, group_id: int, session_id: str = None):
+        self.session_id = session_id or f"{group_id}-{uuid.uuid4().hex}"
+        self.group_id = group_id
+        self.last_active = time.time()
+        # one message is processed at a time per session
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def parse_group_id(session_id: str) -> int:
+        return int(session_id.split("-", 1)[0])
+
+
+class SessionManager:
+    """
+    Create sessions and share one chatbot workflow per group between them.
+    Each session uses its id as the graph thread id, so its history lives in
+    the workflow's checkpointer rather than in the session.
+
+    Both caches are bounded: workflows hold a vector store each, so only the
+    most recently used max_workflows are kept, and sessions idle for longer
+    than session_ttl are dropped. Set session_ttl to the checkpointer's
+    ttl_seconds so a session expires together with its conversation.
+
+    Args:
+        workflow_factory (callable): Build a workflow for a group id. The
+            workflow must provide stream_tokens(message, thread_id) and
+            history(thread_id)
+        thread_exists (callable): Check the checkpointer for a
+            (group_id, thread_id) conversation without building a workflow.
+            None disables reopening sessions
+        max_workflows (int): Number of group workflows to keep
+        session_ttl (float): Seconds a session may be idle, None to keep all
+    """
+
+    def __init__(
+        self,
+        workflow_factory,
+        thread_exists=None,
+        max_workflows: int = 8,
+        session_ttl: Optional[float] = 7 * 24 * 3600,
+    ):
+        self.workflow_factory = workflow_factory
+        self.thread_exists = thread_exists
+        self.max_workflows = max_workflows
+        self.session_ttl = session_ttl
+        # least recently used first
+        self._workflows = OrderedDict()
+        self._group_locks = {}
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_workflow(self, group_id: int):
+        """
+        Return the workflow for a group, building it on first use
+        """
+        with self._lock:
+            if group_id in self._workflows:
+                self._workflows.move_to_end(group_id)
+                return self._workflows[group_id]
+            group_lock = self._group_locks.setdefault(group_id, threading.Lock())
+        # build outside the global lock so other groups are not blocked
+        with group_lock:
+            workflow = self._workflows.get(group_id)
+            if workflow is None:
+                workflow = self.workflow_factory(group_id)
+            with self._lock:
+                self._workflows[group_id] = workflow
+                self._workflows.move_to_end(group_id)
+                while len(self._workflows) > self.max_workflows:
+                    # chats already running keep their reference to the workflow
+                    evicted, _ = self._workflows.popitem(last=False)
+                    self._group_locks.pop(evicted, None)
+            return workflow
+
+    def _add(self, session: Session) -> Session:
+        with self._lock:
+            session = self._sessions.setdefault(session.session_id, session)
+        self.touch(session)
+        return session
+
+    def touch(self, session: Session):
+        """
+        Mark a session as used now
+        """
+        with self._lock:
+            session.last_active = time.time()
+            if session.session_id in self._sessions:
+                self._sessions.move_to_end(session.session_id)
+
+    def create(self, group_id: int) -> Session:
+        self.get_workflow(group_id)
+        self.evict_idle()
+        return self._add(Session(group_id))
+
+    def get(self, session_id: str):
+        self.evict_idle()
+        session = self._sessions.get(session_id)
+        if session:
+            self.touch(session)
+        return session
+
+    def reopen(self, session_id: str):
+        """
+        Recreate a session whose conversation is in the checkpointer, e.g. after
+        a restart or eviction. Returns None if the thread does not exist.
+        The group's workflow is only built once the session is used
+        """
+        group_id = Session.parse_group_id(session_id)
+        if self.thread_exists is None or not self.thread_exists(group_id, session_id):
+            return None
+        return self._add(Session(group_id, session_id))
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Drop sessions idle for longer than session_ttl, returning how many
+        """
+        if self.session_ttl is None:
+            return 0
+        cutoff = (now or time.time()) - self.session_ttl
+        evicted = 0
+        with self._lock:
+            # sessions are ordered by last use, so stop at the first active one
+            for session_id, session in list(self._sessions.items()):
+                if session.last_active >= cutoff:
+                    break
+                if session.lock.locked():
+                    continue
+                del self._sessions[session_id]
+                evicted += 1
+        return evicted
+
+    def history(self, session: Session) -> list:
+        return self.get_workflow(session.group_id).history(session.session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class ChatService:
+    """
+    Run chat requests for sessions on a worker pool
+
+    Args:
+        sessions (SessionManager): Session store
+        pool (WorkerPool): Pool the chatbot runs on
+        request_timeout (float): Seconds to wait for a worker or the next token
+    """
+
+    DONE = object()
+
+    def __init__(
+        self,
+        sessions: SessionManager,
+        pool: WorkerPool,
+        request_timeout: float = 120.0,
+    ):
+        self.sessions = sessions
+        self.pool = pool
+        self.request_timeout = request_timeout
+        self.draining = False
+
+    @property
+    def ready(self) -> bool:
+        return not self.draining and not self.pool.saturated
+
+    def _run(self, fn, *args):
+        """
+        Run a task on the worker pool and wait for its result
+        """
+        return self.pool.submit(fn, *args).result(timeout=self.request_timeout)
+
+    def create_session(self, group_id: int) -> Session:
+        """
+        Create a session, building the group's workflow on the worker pool
+        """
+        return self._run(self.sessions.create, group_id)
+
+    def get_session(self, session_id: str):
+        """
+        Return a live session, or reopen it from the checkpointer
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self._run(self.sessions.reopen, session_id)
+        return session
+
+    def history(self, session: Session) -> list:
+        return self._run(self.sessions.history, session)
+
+    def _run_chat(self, session: Session, message: str, events: queue.Queue, cancel):
+        """
+        Stream the chatbot answer into the events queue
+        """
+        try:
+            # the client already gave up while the message waited in the queue
+            if cancel.is_set():
+                return
+            workflow = self.sessions.get_workflow(session.group_id)
+            tokens = []
+            for token in workflow.stream_tokens(message, thread_id=session.session_id):
+                if cancel.is_set():
+                    break
+                tokens.append(token)
+                events.put({"type": "token", "content": token})
+            else:
+                events.put({"type": "done", "content": "".join(tokens)})
+        except Exception as e:
+            events.put({"type": "error", "error": str(e)})
+        finally:
+            events.put(self.DONE)
+            self.sessions.touch(session)
+            session.lock.release()
+
+    def chat(self, session: Session, message: str):
+        """
+        Queue a message and return a generator of response events.
+        Raises QueueFullError when the pool is at capacity.
+        """
+        if not session.lock.acquire(blocking=False):
+            return None
+        events = queue.Queue()
+        cancel = threading.Event()
+        try:
+            self.pool.submit(self._run_chat, session, message, events, cancel)
+        except QueueFullError:
+            session.lock.release()
+            raise
+        return self._iter_events(events, cancel)
+
+    def _iter_events(self, events: queue.Queue, cancel):
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=self.request_timeout)
+                except queue.Empty:
+                    yield {"type": "error", "error": "Timed out waiting for response"}
+                    return
+                if event is self.DONE:
+                    return
+                yield event
+        finally:
+            # stop the worker if the client went away or timed out
+            cancel.set()
+
+
+class ChatRequestHandler(BaseHTTPRequestHandler):
+    """
+    Route HTTP requests to the ChatService attached to the server
+    """
+
+    protocol_version = "HTTP/1.1"
+    MESSAGES_PATH = re.compile(r"^/sessions/(\d+-[0-9a-f]+)/messages$")
+
+    @property
+    def service(self) -> ChatService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_busy(self):
+        self._send_json(
+            503, {"error": "Server busy, retry later"}, {"Retry-After": "1"}
+        )
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            # the body cannot be read, so it cannot be skipped either
+            self.close_connection = True
+            return None
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return None
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send_json(
+                200,
+                {
+                    "status": "ok",
+                    "in_flight": self.service.pool.in_flight,
+                    "capacity": self.service.pool.capacity,
+                    "sessions": len(self.service.sessions),
+                },
+            )
+            return
+        if self.path == "/readyz":
+            if self.service.ready:
+                self._send_json(200, {"status": "ready"})
+            else:
+                self._send_json(503, {"status": "not ready"})
+            return
+        session = self._find_session()
+        if not session:
+            return
+        try:
+            messages = self.service.history(session)
+        except QueueFullError:
+            self._send_busy()
+            return
+        except FutureTimeoutError:
+            self._send_json(504, {"error": "Timed out loading history"})
+            return
+        except Exception as e:
+            self._send_json(502, {"error": f"Failed to load history: {e}"})
+            return
+        self._send_json(
+            200,
+            {
+                "session_id": session.session_id,
+                "group_id": session.group_id,
+                "messages": messages,
+            },
+        )
+
+    def do_POST(self):
+        body = self._read_json()
+        if not isinstance(body, dict):
+            self._send_json(400, {"error": "Request body must be a JSON object"})
+            return
+        if self.service.draining:
+            self._send_busy()
+            return
+        if self.path == "/sessions":
+            self._create_session(body)
+            return
+        session = self._find_session()
+        if not session:
+            return
+        self._send_message(session, body)
+
+    def _find_session(self):
+        """
+        Return the session named in the path, reopening it from the
+        checkpointer if needed. Sends an error response and returns None
+        when there is no such session
+        """
+        match = self.MESSAGES_PATH.match(self.path)
+        if not match:
+            self._send_json(404, {"error": "Not found"})
+            return None
+        try:
+            session = self.service.get_session(match.group(1))
+        except QueueFullError:
+            self._send_busy()
+            return None
+        except FutureTimeoutError:
+            self._send_json(504, {"error": "Timed out loading session"})
+            return None
+        except Exception as e:
+            self._send_json(502, {"error": f"Failed to load session: {e}"})
+            return None
+        if not session:
+            self._send_json(404, {"error": "Not found"})
+        return session
+
+    def _create_session(self, body: dict):
+        try:
+            group_id = int(body["group_id"])
+        except (KeyError, TypeError, ValueError):
+            self._send_json(400, {"error": "group_id must be an integer"})
+            return
+        try:
+            session = self.service.create_session(group_id)
+        except QueueFullError:
+            self._send_busy()
+            return
+        except FutureTimeoutError:
+            self._send_json(504, {"error": "Timed out creating session"})
+            return
+        except Exception as e:
+            self._send_json(502, {"error": f"Failed to create session: {e}"})
+            return
+        self._send_json(
+            201, {"session_id": session.session_id, "group_id": session.group_id}
+        )
+
+    def _send_message(self, session: Session, body: dict):
+        message = body.get("message")
+        if not isinstance(message, str) or not message.strip():
+            self._send_json(400, {"error": "message must be a non-empty string"})
+            return
+        try:
+            events = self.service.chat(session, message)
+        except QueueFullError:
+            self._send_busy()
+            return
+        if events is None:
+            self._send_json(409, {"error": "Session is busy with another message"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for event in events:
+                self._write_chunk(json.dumps(event).encode() + b"\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # closing the generator cancels the worker
+            events.close()
+            self.close_connection = True
+
+
+class ChatServer(ThreadingHTTPServer):
+    """
+    HTTP server holding the ChatService used by its request handlers
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, service: ChatService, verbose: bool = False):
+        super().__init__(address, ChatRequestHandler)
+        self.service = service
+        self.verbose = verbose
+
+
+def create_server(
+    workflow_factory,
+    thread_exists=None,
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = 4,
+    max_queue: int = 16,
+    request_timeout: float = 120.0,
+    max_workflows: int = 8,
+    session_ttl: Optional[float] = 7 * 24 * 3600,
+    verbose: bool = False,
+) -> ChatServer:
+    """
+    Create a chat server for the given workflow factory
+    """
+    service = ChatService(
+        SessionManager(
+            workflow_factory,
+            thread_exists=thread_exists,
+            max_workflows=max_workflows,
+            session_ttl=session_ttl,
+        ),
+        WorkerPool(workers, max_queue),
+        request_timeout=request_timeout,
+    )
+    return ChatServer((host, port), service, verbose=verbose)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Splitwise chatbot JSON API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=16)
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--drain-seconds", type=float, default=5.0)
+    parser.add_argument("--max-workflows", type=int, default=8)
+    args = parser.parse_args()
+
+    # imported here so the server module does not load the models on import
+    from chatbot import ChatbotWorkflow, thread_exists
+    from splitwise_retriever import config
+
+    # sessions expire together with their conversation in the checkpointer
+    session_ttl = config.get("checkpointer", {}).get("ttl_seconds", 7 * 24 * 3600)
+
+    server = create_server(
+        ChatbotWorkflow,
+        thread_exists=thread_exists,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        request_timeout=args.request_timeout,
+        max_workflows=args.max_workflows,
+        session_ttl=session_ttl,
+        verbose=True,
+    )
+
+    def drain(signum, frame):
+        # fail readiness so the load balancer stops routing, then stop
+        server.service.draining = True
+        threading.Thread(
+            target=lambda: (time.sleep(args.drain_seconds), server.shutdown()),
+            daemon=True,
+        ).start()
+
+    signal.signal(signal.SIGTERM, drain)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ __date__ = "2024-10-28"
 __author__ = "NedeeshaWeerasuriya"
 __version__ = "0.1"
 
+import uuid
+
 import streamlit as st
 
 from chatbot import ChatbotWorkflow
@@ -39,21 +41,35 @@ else:
 
 if "chatbot" not in st.session_state:
     st.session_state.chatbot = ChatbotWorkflow(group_id)
-    # Show an initial message from the chatbot displaying all users and categories
-    st.session_state.messages.append(
-        {
-            "role": "user",
-            "content": "Show me all the possible users and categories in this group",
-        }
-    )
-    with st.chat_message("assistant"):
-        response = st.session_state.chatbot.stream(
-            "Show me all the possible users and categories in this group. Let the user know that they can ask me anything about their Splitwise data."
+    # the thread id is kept in the URL, so returning to the same link reopens the
+    # conversation from the checkpointer, including after a restart
+    st.session_state.thread_id = st.query_params.get("thread", uuid.uuid4().hex)
+    st.query_params["thread"] = st.session_state.thread_id
+
+    if st.session_state.chatbot.has_thread(st.session_state.thread_id):
+        st.session_state.messages = st.session_state.chatbot.history(
+            st.session_state.thread_id
+        )
+        for message in st.session_state.messages:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+    else:
+        # Show an initial message from the chatbot displaying all users and categories
+        st.session_state.messages.append(
+            {
+                "role": "user",
+                "content": "Show me all the possible users and categories in this group",
+            }
         )
+        with st.chat_message("assistant"):
+            response = st.session_state.chatbot.stream(
+                "Show me all the possible users and categories in this group. Let the user know that they can ask me anything about their Splitwise data.",
+                thread_id=st.session_state.thread_id,
+            )
 
-    st.session_state.messages.append({"role": "assistant", "content": response})
-    with st.chat_message("assistant"):
-        st.markdown(response)
+        st.session_state.messages.append({"role": "assistant", "content": response})
+        with st.chat_message("assistant"):
+            st.markdown(response)
 
 
 # Chat input
@@ -64,6 +80,8 @@ if prompt := st.chat_input("Write your message here..."):
 
     # Get response from chatbot
     with st.chat_message("assistant"):
-        response = st.session_state.chatbot.stream(prompt)
+        response = st.session_state.chatbot.stream(
+            prompt, thread_id=st.session_state.thread_id
+        )
         st.markdown(response)
     st.session_state.messages.append({"role": "assistant", "content": response})
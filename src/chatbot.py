@@ -10,52 +10,92 @@ __author__ = "NedeeshaWeerasuriya"
 __version__ = "0.1"
 
 
-import json
+from functools import partial
 
-import streamlit as st
 from langchain_core.messages import SystemMessage
 from langchain_core.tools import tool
 from langgraph.graph import END, MessagesState, StateGraph
 from langgraph.prebuilt import ToolNode, tools_condition
 
-from splitwise_retriever import SplitwiseRetriever
+from checkpointer import build_checkpointer
+from splitwise_retriever import SplitwiseRetriever, config
 
-with open("config.json") as f:
-    config = json.load(f)
+
+def content_text(content) -> str:
+    """
+    Text of a message content, which Anthropic models return either as a string
+    or as a list of content blocks
+    """
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in content
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+
+def thread_config(group_id: int, thread_id: str) -> dict:
+    """
+    Graph config for a conversation thread. Thread ids are namespaced by group
+    so groups sharing a checkpointer never see each other's history
+    """
+    return {"configurable": {"thread_id": f"{group_id}:{thread_id}"}}
+
+
+def thread_exists(group_id: int, thread_id: str) -> bool:
+    """
+    Whether the shared SQLite checkpointer holds a conversation for the thread,
+    checked without building the group's workflow. The in-memory checkpointer
+    is not shared between workflows, so its threads are never found
+    """
+    checkpointer_config = config.get("checkpointer", {})
+    if checkpointer_config.get("backend", "memory") != "sqlite":
+        return False
+    checkpointer = build_checkpointer(**checkpointer_config)
+    return checkpointer.get_tuple(thread_config(group_id, thread_id)) is not None
 
 
 # Step 1
-def query_or_respond(state: MessagesState):
+def query_or_respond(
+    state: MessagesState, splitwise_retriever: SplitwiseRetriever, retrieve_tool
+):
     """
     Generate tool call for retrieval or respond
     """
-    llm_with_tools = splitwise_retriever.llm.bind_tools([retrieve_relevant_docs])
+    llm_with_tools = splitwise_retriever.llm.bind_tools([retrieve_tool])
     response = llm_with_tools.invoke(state["messages"])
     # MessagesState appends messages to state instead of overwriting
     return {"messages": [response]}
 
 
-@tool
-def retrieve_relevant_docs(query: str):
+def make_retrieve_tool(splitwise_retriever: SplitwiseRetriever):
     """
-    Retrieve documents from the vector store
+    Create the retrieval tool bound to a SplitwiseRetriever
     """
-    retriever = splitwise_retriever.get_retriever()
-    retrieved_docs = retriever.invoke(query)
-    # metadata_filters = get_metadata_filters_from_query(query)
-    serialized = "\n\n".join(
-        (f"Source: {doc.metadata}\n" f"Content: {doc.page_content}")
-        for doc in retrieved_docs
-    )
-    return serialized, retrieved_docs
 
+    @tool
+    def retrieve_relevant_docs(query: str):
+        """
+        Retrieve documents from the vector store
+        """
+        retriever = splitwise_retriever.get_retriever()
+        retrieved_docs = retriever.invoke(query)
+        # metadata_filters = get_metadata_filters_from_query(query)
+        serialized = "\n\n".join(
+            (f"Source: {doc.metadata}\n" f"Content: {doc.page_content}")
+            for doc in retrieved_docs
+        )
+        return serialized, retrieved_docs
+
+    return retrieve_relevant_docs
 
-# Step 2: Execute the retrieval.
-tools = ToolNode([retrieve_relevant_docs])
+
+# Step 2: Execute the retrieval with a ToolNode, see generate_graph.
 
 
 # Step 3: Generate responses based on the retrieved documents.
-def generate(state: MessagesState):
+def generate(state: MessagesState, splitwise_retriever: SplitwiseRetriever):
     """
     Generate Answer
     """
@@ -103,14 +143,24 @@ def generate(state: MessagesState):
     return {"messages": [response]}
 
 
-def generate_graph(memory):
+def generate_graph(splitwise_retriever: SplitwiseRetriever, memory):
     """
     Generate the graph for the chatbot
     """
+    retrieve_tool = make_retrieve_tool(splitwise_retriever)
     graph_builder = StateGraph(MessagesState)
-    graph_builder.add_node(query_or_respond)
-    graph_builder.add_node(tools)
-    graph_builder.add_node(generate)
+    graph_builder.add_node(
+        "query_or_respond",
+        partial(
+            query_or_respond,
+            splitwise_retriever=splitwise_retriever,
+            retrieve_tool=retrieve_tool,
+        ),
+    )
+    graph_builder.add_node("tools", ToolNode([retrieve_tool]))
+    graph_builder.add_node(
+        "generate", partial(generate, splitwise_retriever=splitwise_retriever)
+    )
     graph_builder.set_entry_point("query_or_respond")
     graph_builder.add_conditional_edges(
         "query_or_respond",
@@ -132,28 +182,71 @@ class ChatbotWorkflow:
 
     Attributes:
         splitwise_retriever (SplitwiseRetriever): The SplitwiseRetriever instance
+        graph (CompiledStateGraph): The chatbot graph
 
     """
 
     def __init__(self, group_id: int):
-        self.splitwise_retriever = None
-        self.set_up_chatbot_workflow(group_id)
-
-    @staticmethod
-    def set_up_chatbot_workflow(group_id: int):
-        # create global retriever
-        global splitwise_retriever
-        splitwise_retriever = SplitwiseRetriever(group_id)
-        graph = generate_graph(splitwise_retriever.memory)
-        splitwise_retriever.graph = graph
-
-    @staticmethod
-    def stream(input_message: str):
-        for step in splitwise_retriever.graph.stream(
+        self.group_id = group_id
+        self.splitwise_retriever = SplitwiseRetriever(group_id)
+        self.graph = generate_graph(
+            self.splitwise_retriever, self.splitwise_retriever.memory
+        )
+        self.splitwise_retriever.graph = self.graph
+
+    def thread_config(self, thread_id: str) -> dict:
+        return thread_config(self.group_id, thread_id)
+
+    def has_thread(self, thread_id: str) -> bool:
+        """
+        Whether the checkpointer holds a conversation for the thread
+        """
+        config = self.thread_config(thread_id)
+        return self.graph.checkpointer.get_tuple(config) is not None
+
+    def history(self, thread_id: str) -> list:
+        """
+        User messages and final answers of a thread, read from its latest
+        checkpoint
+        """
+        state = self.graph.get_state(self.thread_config(thread_id))
+        return [
+            {
+                "role": "user" if message.type == "human" else "assistant",
+                "content": content_text(message.content),
+            }
+            for message in state.values.get("messages", [])
+            if message.type == "human"
+            or (message.type == "ai" and not message.tool_calls)
+        ]
+
+    def stream(self, input_message: str, thread_id: str):
+        for step in self.graph.stream(
             {"messages": [{"role": "user", "content": input_message}]},
-            config,
+            self.thread_config(thread_id),
             stream_mode="values",
         ):
             step["messages"][-1].pretty_print()
 
         return step["messages"][-1].content
+
+    def stream_tokens(self, input_message: str, thread_id: str):
+        """
+        Yield the text of the answer as it is generated. Answers from the
+        generate step are streamed token by token, a direct answer without
+        retrieval is yielded once complete so no tool call preamble leaks out
+        """
+        for mode, data in self.graph.stream(
+            {"messages": [{"role": "user", "content": input_message}]},
+            self.thread_config(thread_id),
+            stream_mode=["messages", "updates"],
+        ):
+            if mode == "messages":
+                chunk, metadata = data
+                text = content_text(chunk.content)
+                if metadata.get("langgraph_node") == "generate" and text:
+                    yield text
+            elif "query_or_respond" in data:
+                message = data["query_or_respond"]["messages"][-1]
+                if not message.tool_calls:
+                    yield content_text(message.content)
@@ -0,0 +1,406 @@
+"""
+Conversation checkpointers
+
+Durable SQLite checkpointer for the chatbot graph. Only the latest checkpoints
+of each thread are kept, older ones are deleted and the space compacted, and
+threads that have been idle for longer than a TTL are evicted. Every checkpoint
+holds the full graph state, so a thread resumes from its latest checkpoint
+after a restart without replaying its history.
+"""
+
+__date__ = "2025-03-17"
+__author__ = "NedeeshaWeerasuriya"
+__version__ = "0.1"
+
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Any, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_active REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_last_active ON threads (last_active);
+"""
+
+
+class SqliteCheckpointer(BaseCheckpointSaver):
+    """
+    SQLite backed checkpointer with bounded history per thread
+
+    Args:
+        path (str): SQLite database file, ":memory:" for a temporary database
+        keep_last (int): Number of checkpoints kept per thread and namespace
+        ttl_seconds (float): Evict threads idle for longer than this, None to
+            keep threads forever
+        maintenance_interval (float): Minimum seconds between TTL eviction and
+            compaction runs, which happen during put
+    """
+
+    def __init__(
+        self,
+        path: str = "checkpoints.db",
+        keep_last: int = 5,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        maintenance_interval: float = 60.0,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        if keep_last < 1:
+            raise ValueError("keep_last must be at least 1")
+        self.path = path
+        self.keep_last = keep_last
+        self.ttl_seconds = ttl_seconds
+        self.maintenance_interval = maintenance_interval
+        self._last_maintenance = time.time()
+        # one connection shared by the worker threads, guarded by a lock
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # auto_vacuum only takes effect on a new database
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    @staticmethod
+    def _thread_config(thread_id: str, checkpoint_ns: str, checkpoint_id: str):
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    def _load_tuple(self, row: tuple) -> CheckpointTuple:
+        """
+        Build a CheckpointTuple from a checkpoints row and its pending writes
+        """
+        (
+            thread_id,
+            checkpoint_ns,
+            checkpoint_id,
+            parent_checkpoint_id,
+            type_,
+            checkpoint,
+            metadata_type,
+            metadata,
+        ) = row
+        with self._lock:
+            writes = self.conn.execute(
+                "SELECT task_id, channel, type, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+                "ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+        return CheckpointTuple(
+            config=self._thread_config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                self._thread_config(thread_id, checkpoint_ns, parent_checkpoint_id)
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        Get the checkpoint in the config, or the latest one for the thread
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self.conn.execute(query, params).fetchone()
+        return self._load_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """
+        List checkpoints, newest first
+        """
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints WHERE 1 = 1"
+        )
+        params = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        count = 0
+        for row in rows:
+            if limit is not None and count >= limit:
+                break
+            checkpoint_tuple = self._load_tuple(row)
+            if filter and not all(
+                checkpoint_tuple.metadata.get(key) == value
+                for key, value in filter.items()
+            ):
+                continue
+            count += 1
+            yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        Save a checkpoint and drop the thread's checkpoints beyond keep_last
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(metadata)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized_checkpoint,
+                    metadata_type,
+                    serialized_metadata,
+                ),
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, time.time())
+            )
+            self._prune(thread_id, checkpoint_ns)
+        if time.time() - self._last_maintenance > self.maintenance_interval:
+            self.maintain()
+        return self._thread_config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """
+        Save intermediate writes linked to a checkpoint
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # special writes such as errors replace earlier ones
+        verb = (
+            "INSERT OR REPLACE"
+            if all(channel in WRITES_IDX_MAP for channel, _ in writes)
+            else "INSERT OR IGNORE"
+        )
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, serialized_value = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    value_type,
+                    serialized_value,
+                    task_path,
+                )
+            )
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def _prune(self, thread_id: str, checkpoint_ns: str):
+        """
+        Delete checkpoints and writes older than the latest keep_last
+        """
+        cutoff = self.conn.execute(
+            "SELECT checkpoint_id FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last - 1),
+        ).fetchone()
+        if not cutoff:
+            return
+        for table in ("checkpoints", "writes"):
+            self.conn.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, cutoff[0]),
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        """
+        Delete all checkpoints and writes of a thread
+        """
+        with self._lock, self.conn:
+            for table in ("checkpoints", "writes", "threads"):
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,)
+                )
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Delete threads idle for longer than ttl_seconds, returning how many
+        """
+        if self.ttl_seconds is None:
+            return 0
+        cutoff = (now or time.time()) - self.ttl_seconds
+        with self._lock, self.conn:
+            idle = "SELECT thread_id FROM threads WHERE last_active < ?"
+            for table in ("checkpoints", "writes"):
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id IN ({idle})", (cutoff,)
+                )
+            return self.conn.execute(
+                "DELETE FROM threads WHERE last_active < ?", (cutoff,)
+            ).rowcount
+
+    def maintain(self) -> int:
+        """
+        Evict idle threads and return freed pages to the filesystem
+        """
+        self._last_maintenance = time.time()
+        evicted = self.evict_idle()
+        with self._lock:
+            self.conn.execute("PRAGMA incremental_vacuum")
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return evicted
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], **kwargs: Any):
+        for checkpoint_tuple in await asyncio.to_thread(
+            lambda: list(self.list(config, **kwargs))
+        ):
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+
+# checkpointers are shared per database file so each process holds one connection
+_SQLITE_CHECKPOINTERS = {}
+_SQLITE_CHECKPOINTERS_LOCK = threading.Lock()
+
+
+def build_checkpointer(backend: str = "memory", **kwargs: Any):
+    """
+    Build the graph checkpointer named in config.json
+    """
+    if backend == "memory":
+        return MemorySaver()
+    if backend == "sqlite":
+        path = kwargs.get("path", "checkpoints.db")
+        with _SQLITE_CHECKPOINTERS_LOCK:
+            if path == ":memory:" or path not in _SQLITE_CHECKPOINTERS:
+                checkpointer = SqliteCheckpointer(**kwargs)
+                if path == ":memory:":
+                    return checkpointer
+                _SQLITE_CHECKPOINTERS[path] = checkpointer
+            return _SQLITE_CHECKPOINTERS[path]
+    raise ValueError(
+        f"Unknown checkpointer backend '{backend}', expected 'memory' or 'sqlite'"
+    )
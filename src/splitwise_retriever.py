@@ -8,31 +8,57 @@ __author__ = "NedeeshaWeerasuriya"
 __version__ = "0.1"
 
 import json
+import os
+from functools import lru_cache
 
-import chromadb.api
 from langchain.chains.query_constructor.base import AttributeInfo
 from langchain.docstore.document import Document
 from langchain.retrievers.self_query.base import SelfQueryRetriever
 from langchain_anthropic import ChatAnthropic
-from langchain_chroma import Chroma
 from langchain_huggingface.embeddings import HuggingFaceEmbeddings
-from langgraph.checkpoint.memory import MemorySaver
 
-from utilities import process_data
+from checkpointer import build_checkpointer
+from utilities import chunk_expenses, process_data
+from vector_store import NumpyTranslator, NumpyVectorStore, build_vector_store
 
 with open("config.json") as f:
     config = json.load(f)
 
 
+@lru_cache(maxsize=None)
+def get_embeddings():
+    """
+    Embedding model shared by every group, loaded once per process
+    """
+    return HuggingFaceEmbeddings()
+
+
 class SplitwiseRetriever:
     def __init__(self, group_id):
-        self.metadata_field_info = [
+        self.metadata_field_info = self.get_metadata_field_info(
+            config.get("chunking", {}).get("strategy", "expense")
+        )
+
+        self.memory = build_checkpointer(**config.get("checkpointer", {}))
+        self.graph = None
+        self.documents, self.vector_store = self.data_processing(group_id)
+        self.llm = ChatAnthropic(
+            model=config["model"]["name"],
+            temperature=config["model"]["temperature"],
+            max_tokens=config["model"]["max_tokens"],
+        )
+
+    @staticmethod
+    def get_metadata_field_info(strategy: str = "expense"):
+        """
+        Describe the metadata of the documents produced by a chunking strategy
+        """
+        metadata_field_info = [
             AttributeInfo(
                 name="type",
                 description="Type of document: either 'individual' or 'summary'",
                 type="string",
             ),
-            AttributeInfo(name="day", description="Day of the expense", type="int"),
             AttributeInfo(
                 name="month",
                 description="Month of the expense",
@@ -41,19 +67,40 @@ class SplitwiseRetriever:
             AttributeInfo(name="year", description="Year of the expense", type="int"),
             AttributeInfo(
                 name="category",
-                description="Category of the expense",
+                description="Category of the expense. Each individual document "
+                "covers exactly one category",
                 type="string",
             ),
         ]
-
-        self.memory = MemorySaver()
-        self.graph = None
-        self.documents, self.vector_store = self.data_processing(group_id)
-        self.llm = ChatAnthropic(
-            model=config["model"]["name"],
-            temperature=config["model"]["temperature"],
-            max_tokens=config["model"]["max_tokens"],
-        )
+        if strategy in ("expense", "day"):
+            metadata_field_info.append(
+                AttributeInfo(name="day", description="Day of the expense", type="int")
+            )
+        else:
+            # documents span several days, so filter on the range of days
+            metadata_field_info += [
+                AttributeInfo(
+                    name="first_day",
+                    description="First day of the month covered by an individual "
+                    "document. To find day d use first_day <= d and last_day >= d",
+                    type="int",
+                ),
+                AttributeInfo(
+                    name="last_day",
+                    description="Last day of the month covered by an individual "
+                    "document",
+                    type="int",
+                ),
+            ]
+        if strategy == "week":
+            metadata_field_info.append(
+                AttributeInfo(
+                    name="week",
+                    description="ISO week of the year of an individual document",
+                    type="int",
+                )
+            )
+        return metadata_field_info
 
     @staticmethod
     def data_processing(group_id):
@@ -61,28 +108,44 @@ class SplitwiseRetriever:
         Data preparation for langchain
         Get Splitwise data and convert to documents, embeddings and vector store
         """
-        chromadb.api.client.SharedSystemClient.clear_system_cache()
         # Data preparation for langchain
         content_list, metadata = process_data(group_id)
-        # grouped_list = groupby_date(content_list)
+        # group expenses into larger documents, strategy selected in config.json
+        content_list, metadata = chunk_expenses(
+            content_list, metadata, **config.get("chunking", {})
+        )
         documents = [
             Document(page_content=item.lower(), metadata=metadata[i])
             for i, item in enumerate(content_list)
         ]
         # convert to embeddings
-        embeddings = HuggingFaceEmbeddings()
-        # vector store
-        vector_store = Chroma.from_documents(documents, embeddings)
+        embeddings = get_embeddings()
+        # vector store, backend selected in config.json
+        store_config = dict(config.get("vector_store", {}))
+        backend = store_config.pop("backend", "chroma")
+        if store_config.get("persist_path"):
+            # one directory per group so groups never overwrite each other
+            store_config["persist_path"] = os.path.join(
+                store_config["persist_path"], str(group_id)
+            )
+        vector_store = build_vector_store(
+            documents, embeddings, backend=backend, **store_config
+        )
         return documents, vector_store
 
     def get_retriever(self):
         """
         Create and return a configured retriever
         """
+        # the NumPy store is not a langchain builtin, so supply its translator
+        translator = None
+        if isinstance(self.vector_store, NumpyVectorStore):
+            translator = NumpyTranslator()
         return SelfQueryRetriever.from_llm(
             llm=self.llm,
             vectorstore=self.vector_store,
             document_contents="Type of document (summary or individual). Description and cost breakdown of individual expense",
             metadata_field_info=self.metadata_field_info,
             search_kwargs={"k": len(self.documents)},
+            structured_query_translator=translator,
         )
@@ -7,6 +7,8 @@ __author__ = "NedeeshaWeerasuriya"
 __version__ = "0.1"
 
 
+from datetime import datetime
+
 import pandas as pd
 
 from splitwise_api import SplitwiseAPI
@@ -36,19 +38,128 @@ def process_data(group_id):
     return content_list, metadata
 
 
-def groupby_date(content_list):
+def _chunk_header(strategy: str, metadata: dict) -> str:
+    """
+    Describe the period and category covered by a chunk
+    """
+    period = f"{metadata['month']} {metadata['year']}"
+    if strategy == "day":
+        period = f"{metadata['day']} {period}"
+    elif strategy == "week":
+        period = f"week {metadata['week']} of {period}"
+    return f"Expenses for {metadata['category']} in {period}"
+
+
+def _chunk_key(strategy: str, metadata: dict) -> tuple:
     """
-    Group content list by date and return a list of grouped content separated by "||"
+    Key that expenses are grouped by for a chunking strategy. Every key includes
+    the category so a chunk never mixes categories
     """
-    content_dict = {}
-    # group content list by date
-    for item in content_list:
-        date = item.split("Date: ")[1].split("T")[0]
-        if date in content_dict:
-            content_dict[date] = content_dict[date] + " || \n " + item
-        else:
-            content_dict[date] = item
-    return list(content_dict.values())
+    key = (metadata["year"], metadata["month"], metadata["category"])
+    if strategy == "day":
+        return key + (metadata["day"],)
+    if strategy == "week":
+        date = datetime.strptime(
+            f"{metadata['year']} {metadata['month']} {metadata['day']}", "%Y %B %d"
+        )
+        # weeks are split at month boundaries so month stays exact in the metadata
+        return key + (date.isocalendar()[1],)
+    return key
+
+
+def groupby_date(
+    content_list: list,
+    metadata: list,
+    strategy: str = "day",
+    max_chunk_size: int = None,
+) -> tuple:
+    """
+    Group individual expenses into chunks of one category by "day", "week" or
+    "month_category". Each chunk holds at most max_chunk_size expenses, one per
+    line prefixed by its day. Chunks spanning several days record the range in
+    first_day and last_day instead of day, so metadata filters stay exact.
+    """
+    groups = {}
+    for content, item in zip(content_list, metadata):
+        groups.setdefault(_chunk_key(strategy, item), []).append((content, item))
+
+    chunk_contents = []
+    chunk_metadata = []
+    for key, expenses in groups.items():
+        size = max_chunk_size or len(expenses)
+        for start in range(0, len(expenses), size):
+            chunk = expenses[start : start + size]
+            days = [item["day"] for _, item in chunk]
+            chunk_meta = {
+                "type": "individual",
+                "month": chunk[0][1]["month"],
+                "year": chunk[0][1]["year"],
+                "category": chunk[0][1]["category"],
+                "n_expenses": len(chunk),
+            }
+            if strategy == "day":
+                chunk_meta["day"] = days[0]
+            else:
+                chunk_meta["first_day"] = min(days)
+                chunk_meta["last_day"] = max(days)
+            if strategy == "week":
+                chunk_meta["week"] = key[3]
+            lines = [f"Day: {item['day']} || {content}" for content, item in chunk]
+            chunk_contents.append(
+                _chunk_header(strategy, chunk_meta) + ":\n" + "\n".join(lines)
+            )
+            chunk_metadata.append(chunk_meta)
+    return chunk_contents, chunk_metadata
+
+
+CHUNKING_STRATEGIES = ["expense", "day", "week", "month_category"]
+
+
+def chunk_expenses(
+    content_list: list,
+    metadata: list,
+    strategy: str = "expense",
+    max_chunk_size: int = None,
+) -> tuple:
+    """
+    Chunk individual expenses into documents using the given strategy.
+    "expense" keeps one document per expense. Summary documents are passed
+    through unchanged.
+    """
+    if strategy not in CHUNKING_STRATEGIES:
+        raise ValueError(
+            f"Unknown chunking strategy '{strategy}', expected one of {CHUNKING_STRATEGIES}"
+        )
+    if max_chunk_size is not None and (
+        not isinstance(max_chunk_size, int)
+        or isinstance(max_chunk_size, bool)
+        or max_chunk_size < 1
+    ):
+        raise ValueError(
+            f"max_chunk_size must be a positive integer or None, got {max_chunk_size!r}"
+        )
+    if strategy == "expense":
+        return list(content_list), list(metadata)
+
+    individual = [
+        (content, item)
+        for content, item in zip(content_list, metadata)
+        if item["type"] == "individual"
+    ]
+    others = [
+        (content, item)
+        for content, item in zip(content_list, metadata)
+        if item["type"] != "individual"
+    ]
+    chunk_contents, chunk_metadata = groupby_date(
+        [content for content, _ in individual],
+        [item for _, item in individual],
+        strategy=strategy,
+        max_chunk_size=max_chunk_size,
+    )
+    chunk_contents.extend(content for content, _ in others)
+    chunk_metadata.extend(item for _, item in others)
+    return chunk_contents, chunk_metadata
 
 
 def parse_user_expenses(input_data: pd.Series):
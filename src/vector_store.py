@@ -0,0 +1,488 @@
+"""
+Vector store backends
+
+Pluggable vector stores for the Splitwise documents. The default Chroma backend
+is kept for compatibility, and a lightweight in-process NumPy backend is
+provided for small groups where a full database is unnecessary.
+"""
+
+__date__ = "2025-03-10"
+__author__ = "NedeeshaWeerasuriya"
+__version__ = "0.1"
+
+import json
+import operator
+import os
+import tempfile
+import uuid
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.structured_query import (
+    Comparator,
+    Comparison,
+    Operation,
+    Operator,
+    StructuredQuery,
+    Visitor,
+)
+from langchain_core.vectorstores import VectorStore
+
+# Comparison operators supported in metadata filters
+FILTER_COMPARATORS = {
+    "$eq": operator.eq,
+    "$ne": operator.ne,
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process vector store holding all embeddings in one contiguous NumPy array
+
+    Search is exact brute-force cosine similarity. Metadata is held column-wise so
+    filters are evaluated as vectorised boolean masks before scoring. Filters use
+    the same dictionary syntax as Chroma, e.g.
+    {"$and": [{"month": {"$eq": "October"}}, {"category": "groceries"}]}
+
+    Args:
+        embedding (Embeddings): Embedding function used for documents and queries
+        quantize (bool): Store embeddings as int8 with a per-row float32 scale
+        persist_path (str): Directory to write the index to. When set, the
+            embeddings are memory-mapped from disk rather than held in RAM
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    SCALES_FILE = "scales.npy"
+    DOCS_FILE = "docs.json"
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        quantize: bool = False,
+        persist_path: Optional[str] = None,
+    ):
+        self._embedding = embedding
+        self.quantize = quantize
+        self.persist_path = persist_path
+        self._vectors = None
+        self._scales = None
+        self._texts = []
+        self._metadatas = []
+        self._ids = []
+        self._columns = {}
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size in bytes of the stored embeddings
+        """
+        if self._vectors is None:
+            return 0
+        scales = self._scales.nbytes if self._scales is not None else 0
+        return self._vectors.nbytes + scales
+
+    @staticmethod
+    def _normalise(vectors: np.ndarray) -> np.ndarray:
+        """
+        Scale rows to unit length so a dot product is the cosine similarity
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    @staticmethod
+    def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Symmetric per-row int8 quantization returning the codes and scales
+        """
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _build_columns(self):
+        """
+        Convert metadata dictionaries into one object array per key
+        """
+        keys = {key for metadata in self._metadatas for key in metadata}
+        self._columns = {
+            key: np.array(
+                [metadata.get(key) for metadata in self._metadatas], dtype=object
+            )
+            for key in keys
+        }
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """
+        Embed texts and append them to the store
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = self._normalise(self._embedding.embed_documents(texts))
+        scales = None
+        if self.quantize:
+            vectors, scales = self._quantize(vectors)
+
+        if self._vectors is not None:
+            vectors = np.concatenate([np.asarray(self._vectors), vectors])
+            if scales is not None:
+                scales = np.concatenate([self._scales, scales])
+        self._vectors = np.ascontiguousarray(vectors)
+        self._scales = scales
+        self._texts.extend(texts)
+        self._metadatas.extend(dict(metadata) for metadata in metadatas)
+        self._ids.extend(ids)
+        self._build_columns()
+
+        if self.persist_path:
+            self._vectors = self.save(self.persist_path)
+        return ids
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        quantize: bool = False,
+        persist_path: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(embedding, quantize=quantize, persist_path=persist_path)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def save(self, path: str) -> np.ndarray:
+        """
+        Write embeddings and documents to a directory and return the embeddings
+        memory-mapped from the written file. Each file is written to a temporary
+        name and moved into place, so stores that already memory-map the old
+        file keep reading it unchanged
+        """
+        os.makedirs(path, exist_ok=True)
+        # map the new file before it is moved so the mapping is always our own
+        vectors = _atomic_write(
+            os.path.join(path, self.VECTORS_FILE),
+            lambda f: np.save(f, np.asarray(self._vectors)),
+            before_replace=lambda temp_path: np.load(temp_path, mmap_mode="r"),
+        )
+        scales_file = os.path.join(path, self.SCALES_FILE)
+        if self._scales is not None:
+            _atomic_write(scales_file, lambda f: np.save(f, self._scales))
+        elif os.path.exists(scales_file):
+            os.remove(scales_file)
+        docs = {"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas}
+        _atomic_write(
+            os.path.join(path, self.DOCS_FILE),
+            lambda f: f.write(json.dumps(docs, default=_json_default).encode()),
+        )
+        return vectors
+
+    @classmethod
+    def load(cls, path: str, embedding: Embeddings) -> "NumpyVectorStore":
+        """
+        Load a saved store, memory-mapping the embeddings from disk
+        """
+        scales_file = os.path.join(path, cls.SCALES_FILE)
+        quantize = os.path.exists(scales_file)
+        store = cls(embedding, quantize=quantize, persist_path=path)
+        store._vectors = np.load(os.path.join(path, cls.VECTORS_FILE), mmap_mode="r")
+        store._scales = np.load(scales_file) if quantize else None
+        with open(os.path.join(path, cls.DOCS_FILE)) as f:
+            docs = json.load(f)
+        store._ids = docs["ids"]
+        store._texts = docs["texts"]
+        store._metadatas = docs["metadatas"]
+        store._build_columns()
+        return store
+
+    def _compare(self, key: str, op: str, value: Any) -> np.ndarray:
+        """
+        Boolean mask of documents whose metadata field satisfies the comparison
+        """
+        n_docs = len(self)
+        if key not in self._columns:
+            # a missing field only satisfies "not equal" or "not in"
+            return np.full(n_docs, op in ("$ne", "$nin"))
+        column = self._columns[key]
+        if op in ("$in", "$nin"):
+            values = list(value)
+            mask = np.fromiter(
+                (item in values for item in column), dtype=bool, count=n_docs
+            )
+            return ~mask if op == "$nin" else mask
+        if op not in FILTER_COMPARATORS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        compare = FILTER_COMPARATORS[op]
+        try:
+            return np.asarray(compare(column, value), dtype=bool)
+        except TypeError:
+            # mixed types in the column, e.g. year stored as both int and str
+            return np.fromiter(
+                (_safe_compare(compare, item, value) for item in column),
+                dtype=bool,
+                count=n_docs,
+            )
+
+    def _filter_mask(self, filter: dict) -> np.ndarray:
+        """
+        Evaluate a Chroma-style filter dictionary into a boolean mask
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for key, condition in filter.items():
+            if key == "$and":
+                for sub_filter in condition:
+                    mask &= self._filter_mask(sub_filter)
+            elif key == "$or":
+                any_mask = np.zeros(len(self), dtype=bool)
+                for sub_filter in condition:
+                    any_mask |= self._filter_mask(sub_filter)
+                mask &= any_mask
+            elif isinstance(condition, dict):
+                for op, value in condition.items():
+                    mask &= self._compare(key, op, value)
+            else:
+                mask &= self._compare(key, "$eq", condition)
+        return mask
+
+    def _scores(
+        self, query_vector: np.ndarray, rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Cosine similarity between the query and the selected rows, or all rows
+        """
+        vectors = self._vectors if rows is None else self._vectors[rows]
+        scores = vectors @ query_vector
+        if self.quantize:
+            scales = self._scales if rows is None else self._scales[rows]
+            scores = scores * scales
+        return scores
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Exact top-k search returning documents with their cosine similarity
+        """
+        if not len(self) or k <= 0:
+            return []
+        # rows is None for an unfiltered search so the whole matrix is scored
+        # in place, without copying a memory-mapped array into RAM
+        rows = np.flatnonzero(self._filter_mask(filter)) if filter else None
+        n_rows = len(self) if rows is None else len(rows)
+        if not n_rows:
+            return []
+        query_vector = self._normalise(embedding)[0]
+        scores = self._scores(query_vector, rows)
+        if k < n_rows:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(n_rows)
+        top = top[np.argsort(-scores[top])]
+        indices = top if rows is None else rows[top]
+        return [
+            (
+                Document(
+                    id=self._ids[index],
+                    page_content=self._texts[index],
+                    metadata=self._metadatas[index],
+                ),
+                float(score),
+            )
+            for index, score in zip(indices, scores[top])
+        ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(
+            embedding, k=k, filter=filter, **kwargs
+        )
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [
+            doc
+            for doc, _ in self.similarity_search_with_score_by_vector(
+                embedding, k=k, filter=filter, **kwargs
+            )
+        ]
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [
+            doc
+            for doc, _ in self.similarity_search_with_score(
+                query, k=k, filter=filter, **kwargs
+            )
+        ]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # map cosine similarity from [-1, 1] to [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+
+class NumpyTranslator(Visitor):
+    """
+    Translate a self-query StructuredQuery into a NumpyVectorStore filter
+    """
+
+    allowed_operators = [Operator.AND, Operator.OR]
+    allowed_comparators = [
+        Comparator.EQ,
+        Comparator.NE,
+        Comparator.GT,
+        Comparator.GTE,
+        Comparator.LT,
+        Comparator.LTE,
+        Comparator.IN,
+        Comparator.NIN,
+    ]
+
+    def _format_func(self, func: Union[Operator, Comparator]) -> str:
+        self._validate_func(func)
+        return f"${func.value}"
+
+    def visit_operation(self, operation: Operation) -> dict:
+        args = [arg.accept(self) for arg in operation.arguments]
+        return {self._format_func(operation.operator): args}
+
+    def visit_comparison(self, comparison: Comparison) -> dict:
+        return {
+            comparison.attribute: {
+                self._format_func(comparison.comparator): comparison.value
+            }
+        }
+
+    def visit_structured_query(
+        self, structured_query: StructuredQuery
+    ) -> Tuple[str, dict]:
+        if structured_query.filter is None:
+            kwargs = {}
+        else:
+            kwargs = {"filter": structured_query.filter.accept(self)}
+        return structured_query.query, kwargs
+
+
+def _safe_compare(compare: Callable, item: Any, value: Any) -> bool:
+    """
+    Compare two values, treating incomparable types as not matching
+    """
+    try:
+        return bool(compare(item, value))
+    except TypeError:
+        return False
+
+
+def _atomic_write(
+    path: str, write: Callable, before_replace: Optional[Callable] = None
+):
+    """
+    Write a file through a temporary file in the same directory, then replace
+    the target so readers see either the old or the new file, never a mix.
+    Returns the result of before_replace, called with the temporary path
+    """
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        result = before_replace(temp_path) if before_replace else None
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return result
+
+
+def _json_default(value: Any):
+    """
+    Serialise NumPy scalars found in pandas derived metadata
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serialisable")
+
+
+def build_chroma(documents: Sequence[Document], embeddings: Embeddings, **kwargs):
+    """
+    Build a Chroma vector store, clearing any cached Chroma clients first
+    """
+    import chromadb.api
+    from langchain_chroma import Chroma
+
+    chromadb.api.client.SharedSystemClient.clear_system_cache()
+    return Chroma.from_documents(list(documents), embeddings, **kwargs)
+
+
+def build_numpy(documents: Sequence[Document], embeddings: Embeddings, **kwargs):
+    """
+    Build an in-process NumPy vector store
+    """
+    return NumpyVectorStore.from_documents(list(documents), embeddings, **kwargs)
+
+
+VECTOR_STORE_BACKENDS = {
+    "chroma": build_chroma,
+    "numpy": build_numpy,
+}
+
+
+def build_vector_store(
+    documents: Sequence[Document],
+    embeddings: Embeddings,
+    backend: str = "chroma",
+    **kwargs: Any,
+) -> VectorStore:
+    """
+    Build a vector store using the named backend
+    """
+    if backend not in VECTOR_STORE_BACKENDS:
+        raise ValueError(
+            f"Unknown vector store backend '{backend}', "
+            f"expected one of {list(VECTOR_STORE_BACKENDS)}"
+        )
+    return VECTOR_STORE_BACKENDS[backend](documents, embeddings, **kwargs)
@@ -0,0 +1,212 @@
+"""
+Testing the headless chat API
+"""
+
+__date__ = "2025-03-14"
+__author__ = "NedeeshaWeerasuriya"
+__version__ = "0.1"
+
+
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from src.api import (
+    ChatService,
+    QueueFullError,
+    SessionManager,
+    WorkerPool,
+    create_server,
+)
+
+
+class EchoWorkflow:
+    """
+    Stub workflow that streams the message back word by word. Conversations
+    are kept on the class so they outlive a server, like a checkpointer
+    """
+
+    threads = {}
+
+    def __init__(self, group_id):
+        self.group_id = group_id
+
+    def stream_tokens(self, input_message, thread_id):
+        # the graph checkpoints the message before answering
+        messages = self.threads.setdefault(thread_id, [])
+        messages.append({"role": "user", "content": input_message})
+        answer = ""
+        for word in input_message.split():
+            answer += word + " "
+            yield word + " "
+        messages.append({"role": "assistant", "content": answer})
+
+    def history(self, thread_id):
+        return list(self.threads.get(thread_id, []))
+
+
+def echo_thread_exists(group_id, thread_id):
+    return thread_id in EchoWorkflow.threads
+
+
+def start_server(workflow_factory=EchoWorkflow):
+    server = create_server(
+        workflow_factory, thread_exists=echo_thread_exists, host="127.0.0.1", port=0
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop_server(server):
+    server.shutdown()
+    server.server_close()
+    server.service.pool.shutdown()
+
+
+@pytest.fixture
+def server():
+    server = start_server()
+    yield server
+    stop_server(server)
+
+
+def request(server, method, path, body=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    connection.request(method, path, body=json.dumps(body) if body else None)
+    response = connection.getresponse()
+    lines = [json.loads(line) for line in response.read().splitlines()]
+    connection.close()
+    return response.status, lines
+
+
+def test_worker_pool_backpressure():
+    pool = WorkerPool(max_workers=1, max_queue=1)
+    release = threading.Event()
+    pool.submit(release.wait)
+    pool.submit(release.wait)
+    assert pool.saturated
+    with pytest.raises(QueueFullError):
+        pool.submit(release.wait)
+    release.set()
+    pool.shutdown()
+    assert pool.in_flight == 0
+
+
+def test_chat_session(server):
+    status, lines = request(server, "POST", "/sessions", {"group_id": 1})
+    assert status == 201
+    session_id = lines[0]["session_id"]
+
+    status, lines = request(
+        server, "POST", f"/sessions/{session_id}/messages", {"message": "hello world"}
+    )
+    assert status == 200
+    assert [line["type"] for line in lines] == ["token", "token", "done"]
+    assert lines[-1]["content"] == "hello world "
+
+    status, lines = request(server, "GET", f"/sessions/{session_id}/messages")
+    assert status == 200
+    assert [message["role"] for message in lines[0]["messages"]] == [
+        "user",
+        "assistant",
+    ]
+
+
+def test_health_and_errors(server):
+    assert request(server, "GET", "/healthz")[0] == 200
+    assert request(server, "GET", "/readyz")[0] == 200
+    assert request(server, "GET", "/sessions/abc123/messages")[0] == 404
+    assert request(server, "GET", "/sessions/1-abc123/messages")[0] == 404
+    assert request(server, "POST", "/sessions", {"group_id": "x"})[0] == 400
+
+
+def test_reopen_session_after_restart():
+    server = start_server()
+    session_id = request(server, "POST", "/sessions", {"group_id": 1})[1][0][
+        "session_id"
+    ]
+    request(server, "POST", f"/sessions/{session_id}/messages", {"message": "hi"})
+    stop_server(server)
+
+    # a new server knows nothing about the session until it is reopened
+    server = start_server()
+    try:
+        path = f"/sessions/{session_id}/messages"
+        assert request(server, "POST", path, {"message": "again"})[0] == 200
+        status, lines = request(server, "GET", path)
+        assert status == 200
+        assert lines[0]["group_id"] == 1
+        assert [message["content"] for message in lines[0]["messages"]] == [
+            "hi",
+            "hi ",
+            "again",
+            "again ",
+        ]
+    finally:
+        stop_server(server)
+
+
+def test_evict_workflows_and_sessions():
+    built = []
+    sessions = SessionManager(
+        lambda group_id: built.append(group_id) or EchoWorkflow(group_id),
+        max_workflows=2,
+        session_ttl=60,
+    )
+    for group_id in (1, 2, 1, 3):
+        sessions.get_workflow(group_id)
+    # group 2 was least recently used, so it is rebuilt
+    sessions.get_workflow(2)
+    assert built == [1, 2, 3, 2]
+
+    session = sessions.create(1)
+    assert sessions.evict_idle(now=time.time() + 30) == 0
+    assert sessions.evict_idle(now=time.time() + 120) == 1
+    assert sessions.get(session.session_id) is None
+    assert len(sessions) == 0
+
+
+def test_reopen_without_building_workflows():
+    built = []
+
+    def failing_factory(group_id):
+        built.append(group_id)
+        raise RuntimeError("Splitwise is down")
+
+    server = start_server(failing_factory)
+    try:
+        # an unknown session is rejected without fetching the group
+        assert request(server, "GET", "/sessions/5-abc123/messages")[0] == 404
+        assert built == []
+        # a known session whose workflow fails to build gets an error response
+        EchoWorkflow.threads["6-abc123"] = []
+        assert request(server, "GET", "/sessions/6-abc123/messages")[0] == 502
+        assert built == [6]
+    finally:
+        stop_server(server)
+
+
+def test_invalid_content_length(server):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    connection.putrequest("POST", "/sessions")
+    connection.putheader("Content-Length", "abc")
+    connection.endheaders()
+    assert connection.getresponse().status == 400
+    connection.close()
+
+
+def test_timed_out_message_is_not_run():
+    pool = WorkerPool(max_workers=1, max_queue=1)
+    service = ChatService(SessionManager(EchoWorkflow), pool, request_timeout=0.2)
+    session = service.sessions.create(7)
+    release = threading.Event()
+    pool.submit(release.wait)
+    events = list(service.chat(session, "queued message"))
+    assert events == [{"type": "error", "error": "Timed out waiting for response"}]
+    release.set()
+    pool.shutdown()
+    assert session.session_id not in EchoWorkflow.threads
+    assert not session.lock.locked()
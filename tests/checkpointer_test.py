@@ -0,0 +1,87 @@
+"""
+Testing the SQLite conversation checkpointer
+"""
+
+__date__ = "2025-03-17"
+__author__ = "NedeeshaWeerasuriya"
+__version__ = "0.1"
+
+
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, MessagesState, StateGraph
+
+from src.checkpointer import SqliteCheckpointer, build_checkpointer
+
+
+def echo(state: MessagesState):
+    """
+    Stub chatbot node that echoes the last message
+    """
+    return {"messages": [AIMessage(f"echo: {state['messages'][-1].content}")]}
+
+
+def make_graph(checkpointer):
+    graph_builder = StateGraph(MessagesState)
+    graph_builder.add_node(echo)
+    graph_builder.set_entry_point("echo")
+    graph_builder.add_edge("echo", END)
+    return graph_builder.compile(checkpointer=checkpointer)
+
+
+def chat(graph, thread_id, message):
+    return graph.invoke(
+        {"messages": [{"role": "user", "content": message}]},
+        {"configurable": {"thread_id": thread_id}},
+    )
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "checkpoints.db")
+
+
+def test_keeps_latest_checkpoints(db_path):
+    checkpointer = SqliteCheckpointer(db_path, keep_last=2)
+    graph = make_graph(checkpointer)
+    for i in range(5):
+        chat(graph, "a", f"message {i}")
+    config = {"configurable": {"thread_id": "a"}}
+    assert len(list(checkpointer.list(config))) == 2
+    # the latest checkpoint still holds the whole conversation
+    assert len(graph.get_state(config).values["messages"]) == 10
+
+
+def test_resume_after_restart(db_path):
+    checkpointer = SqliteCheckpointer(db_path, keep_last=1)
+    chat(make_graph(checkpointer), "a", "hello")
+    checkpointer.close()
+
+    graph = make_graph(SqliteCheckpointer(db_path, keep_last=1))
+    messages = chat(graph, "a", "again")["messages"]
+    assert [message.content for message in messages] == [
+        "hello",
+        "echo: hello",
+        "again",
+        "echo: again",
+    ]
+
+
+def test_evict_idle_threads(db_path):
+    checkpointer = SqliteCheckpointer(db_path, ttl_seconds=60)
+    graph = make_graph(checkpointer)
+    chat(graph, "a", "hello")
+    chat(graph, "b", "hello")
+    assert checkpointer.evict_idle(now=time.time() + 30) == 0
+    assert checkpointer.evict_idle(now=time.time() + 120) == 2
+    assert checkpointer.get_tuple({"configurable": {"thread_id": "a"}}) is None
+
+
+def test_build_checkpointer(db_path):
+    assert build_checkpointer("sqlite", path=db_path) is build_checkpointer(
+        "sqlite", path=db_path
+    )
+    with pytest.raises(ValueError):
+        build_checkpointer("redis")
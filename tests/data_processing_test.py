@@ -10,6 +10,7 @@ __version__ = "0.1"
 import pytest
 import pandas as pd
 from src.utilities import (
+    chunk_expenses,
     clean_data,
     summarise_monthly_expenses,
     process_data,
@@ -166,3 +167,161 @@ def test_summarise_monthly_expenses(synth_data):
     assert all([item["type"] == "summary" for item in summary_metadata])
     assert summary_metadata[0]["month"] == "October"
     assert summary_metadata[-1]["month"] == "November"
+
+
+@pytest.mark.parametrize(
+    "strategy, max_chunk_size, n_chunks",
+    [
+        ("expense", None, 9),
+        ("day", None, 9),
+        ("week", None, 9),
+        ("month_category", None, 8),
+        ("month_category", 1, 9),
+    ],
+)
+def test_chunk_expenses(synth_data, strategy, max_chunk_size, n_chunks):
+    keep_columns = [
+        "description",
+        "cost",
+        "currency_code",
+        "date",
+        "category",
+        "users",
+    ]
+    data, content_list, metadata = clean_data(synth_data, keep_columns)
+    summary_contents, summary_metadata = summarise_monthly_expenses(data)
+    content_list.extend(summary_contents)
+    metadata.extend(summary_metadata)
+    chunk_contents, chunk_metadata = chunk_expenses(
+        content_list, metadata, strategy=strategy, max_chunk_size=max_chunk_size
+    )
+    # 5 expenses and 4 summaries, summaries are never chunked
+    assert len(chunk_contents) == len(chunk_metadata) == n_chunks
+    assert chunk_metadata[-4:] == summary_metadata
+    if strategy == "month_category" and not max_chunk_size:
+        # both October dining out expenses share one chunk
+        assert chunk_metadata[0]["category"] == "dining out"
+        assert chunk_metadata[0]["month"] == "October"
+        assert chunk_metadata[0]["n_expenses"] == 2
+        assert "Dining Out 2" in chunk_contents[0]
+
+
+def test_chunk_expenses_unknown_strategy():
+    with pytest.raises(ValueError):
+        chunk_expenses([], [], strategy="year")
+
+
+@pytest.mark.parametrize("max_chunk_size", [0, -1, 2.5, "20", True])
+def test_chunk_expenses_invalid_max_chunk_size(max_chunk_size):
+    with pytest.raises(ValueError):
+        chunk_expenses([], [], strategy="day", max_chunk_size=max_chunk_size)
+
+
+@pytest.fixture
+def synth_data_shared_days(synth_data):
+    """
+    Add expenses sharing a day and an ISO week with the synthetic dataset
+    """
+    extra_data = [
+        {
+            "description": description,
+            "category": {"name": category},
+            "cost": cost,
+            "currency_code": "GBP",
+            "date": date,
+            "users": [
+                {
+                    "user": {"first_name": "Alice", "last_name": "Z"},
+                    "user_id": 1,
+                    "paid_share": str(cost),
+                    "owed_share": str(cost),
+                }
+            ],
+        }
+        for description, category, cost, date in [
+            # same day and category as "Dining Out" on 5 October
+            ("Lunch", "Dining out", 12.00, "2024-10-05T12:00:00Z"),
+            # same day, different category
+            ("Snacks", "Groceries", 8.00, "2024-10-05T16:00:00Z"),
+            # previous day, same ISO week (40) as 5 October
+            ("Breakfast", "Dining out", 9.00, "2024-10-04T08:00:00Z"),
+        ]
+    ]
+    extra_df = pd.DataFrame(extra_data)
+    extra_df["date"] = pd.to_datetime(extra_df["date"])
+    return pd.concat([synth_data, extra_df], ignore_index=True)
+
+
+@pytest.mark.parametrize(
+    "strategy, max_chunk_size, chunk_sizes",
+    [
+        ("expense", None, [1] * 8),
+        ("day", None, [2, 1, 1, 1, 1, 1, 1]),
+        ("week", None, [3, 1, 1, 1, 1, 1]),
+        ("week", 2, [2, 1, 1, 1, 1, 1, 1]),
+        ("month_category", None, [4, 2, 1, 1]),
+        ("month_category", 3, [3, 2, 1, 1, 1]),
+    ],
+)
+def test_chunk_grouping(synth_data_shared_days, strategy, max_chunk_size, chunk_sizes):
+    keep_columns = [
+        "description",
+        "cost",
+        "currency_code",
+        "date",
+        "category",
+        "users",
+    ]
+    _, content_list, metadata = clean_data(synth_data_shared_days, keep_columns)
+    chunk_contents, chunk_metadata = chunk_expenses(
+        content_list, metadata, strategy=strategy, max_chunk_size=max_chunk_size
+    )
+    if strategy == "expense":
+        assert chunk_metadata == metadata
+        return
+    assert sorted(item["n_expenses"] for item in chunk_metadata) == sorted(chunk_sizes)
+    assert sum(content.count("Description:") for content in chunk_contents) == 8
+    for content, item in zip(chunk_contents, chunk_metadata):
+        # every chunk covers one category, so category filters stay exact
+        assert item["category"] in ("dining out", "groceries")
+        assert content.startswith(f"Expenses for {item['category']}")
+        assert "categories" not in item
+        if strategy == "day":
+            assert "first_day" not in item
+        else:
+            assert "day" not in item
+            assert item["first_day"] <= item["last_day"]
+
+
+def test_chunk_day_metadata(synth_data_shared_days):
+    keep_columns = [
+        "description",
+        "cost",
+        "currency_code",
+        "date",
+        "category",
+        "users",
+    ]
+    _, content_list, metadata = clean_data(synth_data_shared_days, keep_columns)
+
+    _, day_metadata = chunk_expenses(content_list, metadata, strategy="day")
+    fifth_october = [
+        item for item in day_metadata if item["month"] == "October" and item["day"] == 5
+    ]
+    assert sorted((item["category"], item["n_expenses"]) for item in fifth_october) == [
+        ("dining out", 2),
+        ("groceries", 1),
+    ]
+
+    week_contents, week_metadata = chunk_expenses(
+        content_list, metadata, strategy="week"
+    )
+    week_40 = [
+        (content, item)
+        for content, item in zip(week_contents, week_metadata)
+        if item["week"] == 40 and item["category"] == "dining out"
+    ]
+    assert len(week_40) == 1
+    content, item = week_40[0]
+    assert (item["first_day"], item["last_day"], item["n_expenses"]) == (4, 5, 3)
+    assert "Day: 4 || Description: Breakfast" in content
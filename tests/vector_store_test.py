@@ -0,0 +1,122 @@
+"""
+Testing the NumPy vector store backend
+"""
+
+__date__ = "2025-03-10"
+__author__ = "NedeeshaWeerasuriya"
+__version__ = "0.1"
+
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.vector_store import NumpyVectorStore, build_vector_store
+
+
+class KeywordEmbeddings(Embeddings):
+    """
+    Embed text as counts of a few keywords so similarity is predictable
+    """
+
+    KEYWORDS = ["coffee", "groceries", "rent", "train"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(text.count(word)) + 0.01 for word in self.KEYWORDS]
+
+
+@pytest.fixture
+def documents():
+    """
+    Create synthetic documents
+    """
+    return [
+        Document(
+            page_content="coffee at the station",
+            metadata={"type": "individual", "day": 5, "month": "October", "year": 2024},
+        ),
+        Document(
+            page_content="weekly groceries",
+            metadata={
+                "type": "individual",
+                "day": 10,
+                "month": "October",
+                "year": 2024,
+            },
+        ),
+        Document(
+            page_content="rent for november",
+            metadata={
+                "type": "individual",
+                "day": 1,
+                "month": "November",
+                "year": 2024,
+            },
+        ),
+        Document(
+            page_content="groceries summary",
+            metadata={"type": "summary", "month": "October", "year": "2024"},
+        ),
+    ]
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_similarity_search(documents, quantize):
+    store = NumpyVectorStore.from_documents(
+        documents, KeywordEmbeddings(), quantize=quantize
+    )
+    results = store.similarity_search("groceries", k=2)
+    assert len(results) == 2
+    assert all("groceries" in doc.page_content for doc in results)
+
+
+def test_metadata_filter(documents):
+    store = build_vector_store(documents, KeywordEmbeddings(), backend="numpy")
+    results = store.similarity_search(
+        "groceries",
+        k=10,
+        filter={"$and": [{"month": {"$eq": "October"}}, {"type": "individual"}]},
+    )
+    assert [doc.page_content for doc in results][0] == "weekly groceries"
+    assert len(results) == 2
+    # summaries have no day so are excluded from range filters
+    results = store.similarity_search("rent", k=10, filter={"day": {"$gte": 5}})
+    assert {doc.page_content for doc in results} == {
+        "coffee at the station",
+        "weekly groceries",
+    }
+
+
+def test_persist_and_load(documents, tmp_path):
+    store = NumpyVectorStore.from_documents(
+        documents, KeywordEmbeddings(), quantize=True, persist_path=str(tmp_path)
+    )
+    loaded = NumpyVectorStore.load(str(tmp_path), KeywordEmbeddings())
+    assert len(loaded) == len(store)
+    assert loaded.quantize
+    assert loaded.similarity_search("rent", k=1)[0].page_content == "rent for november"
+
+
+def test_unknown_backend(documents):
+    with pytest.raises(ValueError):
+        build_vector_store(documents, KeywordEmbeddings(), backend="faiss")
+
+
+def test_stores_sharing_persist_path(documents, tmp_path):
+    first = NumpyVectorStore.from_documents(
+        documents[:2], KeywordEmbeddings(), persist_path=str(tmp_path)
+    )
+    # same shape but rows in a different order, so a shared mapping would misrank
+    second = NumpyVectorStore.from_documents(
+        [documents[3], documents[2]], KeywordEmbeddings(), persist_path=str(tmp_path)
+    )
+    assert first.similarity_search("groceries", k=1)[0].page_content == (
+        "weekly groceries"
+    )
+    assert second.similarity_search("groceries", k=1)[0].page_content == (
+        "groceries summary"
+    )
+    assert len(NumpyVectorStore.load(str(tmp_path), KeywordEmbeddings())) == 2
@@ -0,0 +1,286 @@
+"""
+Chat API load test
+
+Start the chat API in-process with the real ChatbotWorkflow, then drive it with
+concurrent clients that each open a session and send several messages. Only
+the external services are replaced: Splitwise returns a synthetic group after a
+delay, the LLM is a stub chat model that streams tokens with LLM-like latencies
+and the embedding model is a hashing embedding. Retrieval, the self-query
+translator, the graph, token streaming and the SQLite checkpointer all run as
+in production, on the NumPy vector store.
+
+Reports throughput, p50/p99 latency to first token and to the full answer, and
+how many requests were rejected by backpressure.
+
+Pass --url to target an already running server instead.
+
+Usage: python workflows/api_load_test.py --clients 32 --messages 5 --workers 4
+"""
+
+__date__ = "2025-03-14"
+__author__ = "NedeeshaWeerasuriya"
+__version__ = "0.1"
+
+
+# %% --------------------------------------------------------------------------
+# Import Modules
+import argparse
+import http.client
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from api import create_server  # noqa: E402
+from chunking_benchmark import HashingEmbeddings, make_expenses  # noqa: E402
+from utilities import clean_data, summarise_monthly_expenses  # noqa: E402
+
+SPLITWISE_DELAY = 0.2
+N_EXPENSES = 300
+USER_QUERY = re.compile(r"User Query:\s*(.*?)\s*Structured Request:", re.DOTALL)
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Stand-in for ChatAnthropic that answers each step of the chatbot graph:
+    the first call asks for retrieval, the self-query retriever gets a
+    structured query and the generate step streams an answer
+    """
+
+    first_token_delay: float = 0.3
+    token_delay: float = 0.01
+    n_tokens: int = 30
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages) -> AIMessage:
+        text = messages[-1].content
+        queries = USER_QUERY.findall(text)
+        if queries:
+            # the self-query retriever's query constructor prompt
+            request = {"query": queries[-1], "filter": 'eq("type", "individual")'}
+            return AIMessage(f"```json\n{json.dumps(request)}\n```")
+        if messages[0].type == "system":
+            n_docs = messages[0].content.count("Source:")
+            words = [f"Found {n_docs} documents."]
+            words += [f"token{i}" for i in range(self.n_tokens - 1)]
+            return AIMessage(" ".join(words))
+        return AIMessage(
+            "",
+            tool_calls=[
+                {
+                    "name": "retrieve_relevant_docs",
+                    "args": {"query": text},
+                    "id": uuid.uuid4().hex,
+                }
+            ],
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._respond(messages)
+        time.sleep(
+            self.first_token_delay + self.token_delay * len(message.content.split())
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._respond(messages)
+        time.sleep(self.first_token_delay)
+        if message.tool_calls:
+            tool_call = message.tool_calls[0]
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    "",
+                    tool_call_chunks=[
+                        {
+                            "name": tool_call["name"],
+                            "args": json.dumps(tool_call["args"]),
+                            "id": tool_call["id"],
+                            "index": 0,
+                        }
+                    ],
+                )
+            )
+            return
+        for word in message.content.split():
+            time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(word + " "))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def stub_process_data(group_id: int):
+    """
+    Synthetic Splitwise group, fetched with a delay like the Splitwise API
+    """
+    time.sleep(SPLITWISE_DELAY)
+    data, content_list, metadata = clean_data(
+        make_expenses(N_EXPENSES),
+        ["description", "cost", "currency_code", "date", "category", "users"],
+    )
+    summary_contents, summary_metadata = summarise_monthly_expenses(data)
+    return content_list + summary_contents, metadata + summary_metadata
+
+
+def load_workflow(temp_dir: str):
+    """
+    Import ChatbotWorkflow and thread_exists with the external services replaced by stubs and
+    checkpoints written to a temporary database
+    """
+    # config.json is read relative to the working directory
+    os.chdir(ROOT)
+    import splitwise_retriever
+
+    splitwise_retriever.process_data = stub_process_data
+    splitwise_retriever.ChatAnthropic = lambda **kwargs: StubChatModel()
+    splitwise_retriever.HuggingFaceEmbeddings = HashingEmbeddings
+    splitwise_retriever.config["vector_store"] = {"backend": "numpy"}
+    splitwise_retriever.config["checkpointer"] = {
+        "backend": "sqlite",
+        "path": os.path.join(temp_dir, "checkpoints.db"),
+    }
+    from chatbot import ChatbotWorkflow, thread_exists
+
+    return ChatbotWorkflow, thread_exists
+
+
+def request(url, method: str, path: str, body: dict = None):
+    """
+    Send a request and return the status and the response body lines, with the
+    time to the first line and to the end of the response
+    """
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=300)
+    start = time.perf_counter()
+    connection.request(
+        method,
+        path,
+        body=json.dumps(body or {}),
+        headers={"Content-Type": "application/json"},
+    )
+    response = connection.getresponse()
+    first_line = None
+    lines = []
+    for line in response:
+        if first_line is None:
+            first_line = time.perf_counter() - start
+        lines.append(json.loads(line))
+    total = time.perf_counter() - start
+    connection.close()
+    return response.status, lines, first_line, total
+
+
+def run_client(url, group_id: int, n_messages: int, results: dict, lock):
+    """
+    Open a session and send messages one after another
+    """
+    status, lines, _, _ = request(url, "POST", "/sessions", {"group_id": group_id})
+    if status != 201:
+        with lock:
+            results["rejected"] += 1
+        return
+    session_id = lines[0]["session_id"]
+    for i in range(n_messages):
+        status, lines, first, total = request(
+            url,
+            "POST",
+            f"/sessions/{session_id}/messages",
+            {"message": f"How much did I spend on groceries? ({i})"},
+        )
+        with lock:
+            # an answer without documents means retrieval failed
+            if (
+                status == 200
+                and lines
+                and lines[-1]["type"] == "done"
+                and not lines[-1]["content"].startswith("Found 0 ")
+            ):
+                results["first_token"].append(first)
+                results["latency"].append(total)
+            elif status == 503:
+                results["rejected"] += 1
+            else:
+                results["failed"] += 1
+
+
+# %%
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Target a running server, e.g. http://host:8000")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--groups", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=16)
+    args = parser.parse_args()
+
+    server = None
+    temp_dir = tempfile.TemporaryDirectory()
+    if args.url:
+        url = urlparse(args.url)
+    else:
+        workflow_factory, thread_exists = load_workflow(temp_dir.name)
+        server = create_server(
+            workflow_factory,
+            thread_exists=thread_exists,
+            host="127.0.0.1",
+            port=0,
+            workers=args.workers,
+            max_queue=args.max_queue,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = urlparse(f"http://127.0.0.1:{server.server_address[1]}")
+
+    results = {"first_token": [], "latency": [], "rejected": 0, "failed": 0}
+    lock = threading.Lock()
+    clients = [
+        threading.Thread(
+            target=run_client,
+            args=(url, 1000 + i % args.groups, args.messages, results, lock),
+        )
+        for i in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+
+    if server:
+        server.shutdown()
+        server.service.pool.shutdown()
+    temp_dir.cleanup()
+
+    completed = len(results["latency"])
+    print(f"clients={args.clients} messages={args.messages} workers={args.workers}")
+    print(
+        f"completed: {completed}  rejected: {results['rejected']}"
+        f"  failed: {results['failed']}"
+    )
+    print(f"throughput: {completed / elapsed:.2f} messages/s over {elapsed:.1f}s")
+    if completed:
+        for name in ("first_token", "latency"):
+            values = np.array(results[name]) * 1e3
+            print(
+                f"{name:<12} p50: {np.percentile(values, 50):8.1f} ms"
+                f"  p99: {np.percentile(values, 99):8.1f} ms"
+            )
@@ -0,0 +1,139 @@
+"""
+Checkpointer soak test
+
+Simulate thousands of chat sessions against a stub chatbot graph and sample
+process memory and database size as they run, comparing the in-memory
+MemorySaver with the bounded SqliteCheckpointer. Finally reopen the database
+and time resuming a thread, which loads only its latest checkpoint.
+
+Usage: python workflows/checkpointer_soak_test.py --sessions 5000 --turns 4
+"""
+
+__date__ = "2025-03-17"
+__author__ = "NedeeshaWeerasuriya"
+__version__ = "0.1"
+
+
+# %% --------------------------------------------------------------------------
+# Import Modules
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, MessagesState, StateGraph
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from checkpointer import SqliteCheckpointer  # noqa: E402
+
+ANSWER = "Your total spend on groceries in October was 45.67 GBP. " * 5
+
+
+def answer(state: MessagesState):
+    """
+    Stub chatbot node with a realistically sized answer
+    """
+    return {"messages": [AIMessage(ANSWER)]}
+
+
+def make_graph(checkpointer):
+    graph_builder = StateGraph(MessagesState)
+    graph_builder.add_node(answer)
+    graph_builder.set_entry_point("answer")
+    graph_builder.add_edge("answer", END)
+    return graph_builder.compile(checkpointer=checkpointer)
+
+
+def current_rss_mb() -> float:
+    """
+    Resident set size of this process in MB
+    """
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def db_size_mb(path: str) -> float:
+    return (
+        sum(
+            os.path.getsize(path + suffix)
+            for suffix in ("", "-wal")
+            if os.path.exists(path + suffix)
+        )
+        / 1e6
+    )
+
+
+def soak(name, checkpointer, n_sessions, turns, db_path=None, report_every=1000):
+    """
+    Run sessions one after another, each sending several messages
+    """
+    graph = make_graph(checkpointer)
+    start = time.perf_counter()
+    print(f"\n{name}")
+    print(f"{'sessions':>9}{'rss MB':>9}{'db MB':>8}{'turns/s':>9}")
+    for session in range(1, n_sessions + 1):
+        config = {"configurable": {"thread_id": f"session-{session}"}}
+        for turn in range(turns):
+            graph.invoke(
+                {"messages": [{"role": "user", "content": f"question {turn}"}]},
+                config,
+            )
+        if session % report_every == 0:
+            rate = session * turns / (time.perf_counter() - start)
+            db = f"{db_size_mb(db_path):.1f}" if db_path else "-"
+            print(f"{session:>9}{current_rss_mb():>9.1f}{db:>8}{rate:>9.0f}")
+
+
+# %%
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--keep-last", type=int, default=2)
+    parser.add_argument("--ttl", type=float, default=2.0)
+    args = parser.parse_args()
+    report_every = max(args.sessions // 5, 1)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "checkpoints.db")
+        # a short TTL and maintenance interval evict sessions during the run
+        checkpointer = SqliteCheckpointer(
+            db_path,
+            keep_last=args.keep_last,
+            ttl_seconds=args.ttl,
+            maintenance_interval=args.ttl,
+        )
+        soak(
+            f"SqliteCheckpointer keep_last={args.keep_last} ttl={args.ttl}s",
+            checkpointer,
+            args.sessions,
+            args.turns,
+            db_path=db_path,
+            report_every=report_every,
+        )
+        checkpointer.close()
+
+        # resume the most recent session from a fresh connection
+        start = time.perf_counter()
+        graph = make_graph(SqliteCheckpointer(db_path, ttl_seconds=None))
+        state = graph.get_state(
+            {"configurable": {"thread_id": f"session-{args.sessions}"}}
+        )
+        resume_ms = (time.perf_counter() - start) * 1e3
+        print(
+            f"resumed session-{args.sessions} with {len(state.values['messages'])} "
+            f"messages in {resume_ms:.1f} ms"
+        )
+
+    soak(
+        "MemorySaver",
+        MemorySaver(),
+        args.sessions,
+        args.turns,
+        report_every=report_every,
+    )
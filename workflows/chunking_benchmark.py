@@ -0,0 +1,297 @@
+"""
+Chunking benchmark
+
+Compare document chunking strategies on a synthetic Splitwise group. For each
+strategy report the number of documents, index build time, retrieval latency,
+retrieved payload size, expense recall and answer accuracy on three kinds of
+synthetic question:
+    month        "how much was spent on <category> in <month> <year>"
+    day          "how much was spent on <category> on <day> <month> <year>"
+    description  "how much did <description> cost"
+Month and day questions use the metadata filters a self-query retriever would
+build for the strategy, description questions rely on similarity alone.
+
+Every strategy retrieves the same number of documents, so larger chunks carry
+more expenses per query. Answers are computed by an oracle reader that sums the
+matching expenses found in the retrieved documents, so accuracy measures
+retrieval rather than the LLM.
+
+Usage: python workflows/chunking_benchmark.py
+"""
+
+__date__ = "2025-03-12"
+__author__ = "NedeeshaWeerasuriya"
+__version__ = "0.1"
+
+
+# %% --------------------------------------------------------------------------
+# Import Modules
+import os
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utilities import chunk_expenses, clean_data  # noqa: E402
+from vector_store import NumpyVectorStore  # noqa: E402
+
+N_EXPENSES = 3000
+TOP_K = 10
+DIMENSION = 4096
+STRATEGIES = [
+    ("expense", None),
+    ("day", 20),
+    ("week", 20),
+    ("month_category", 20),
+    ("month_category", 50),
+]
+SHOPS = {
+    "Groceries": ["tesco", "sainsburys", "aldi", "lidl"],
+    "Dining out": ["pizza", "sushi", "pub", "burger"],
+    "Transportation": ["train", "uber", "bus", "petrol"],
+    "Household supplies": ["cleaning", "toilet roll", "bin bags"],
+    "Entertainment": ["cinema", "concert", "bowling"],
+}
+QUESTION_TYPES = ["month", "day", "description"]
+DAY_PATTERN = re.compile(r"^day: (\d+) \|\|")
+DESCRIPTION_PATTERN = re.compile(r"description: (.+?) \|\|")
+COST_PATTERN = re.compile(r"total cost of item: ([\d.]+)")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Set of words hashed into a fixed number of buckets, a cheap stand-in for a
+    sentence embedding model that still rewards shared words. Presence rather
+    than counts stops the repeated field names in large chunks dominating
+    """
+
+    def _embed(self, text: str) -> list:
+        vector = np.zeros(DIMENSION, dtype=np.float32)
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            vector[zlib.crc32(token.encode()) % DIMENSION] = 1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._embed(text)
+
+
+def make_expenses(n_expenses: int) -> pd.DataFrame:
+    """
+    Create a synthetic year of expenses in the Splitwise API format
+    """
+    rng = np.random.default_rng(0)
+    categories = list(SHOPS)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        rng.integers(0, 366, n_expenses), unit="D"
+    )
+    rows = []
+    for i, date in enumerate(dates):
+        category = categories[rng.integers(len(categories))]
+        shop = SHOPS[category][rng.integers(len(SHOPS[category]))]
+        cost = round(float(rng.uniform(2, 120)), 2)
+        rows.append(
+            {
+                "description": f"{shop} {i}",
+                "category": {"name": category},
+                "cost": f"{cost:.2f}",
+                "currency_code": "GBP",
+                "date": date,
+                "users": [
+                    {
+                        "user": {"first_name": "Alice", "last_name": "Z"},
+                        "paid_share": f"{cost:.2f}",
+                        "owed_share": f"{cost / 2:.2f}",
+                    },
+                    {
+                        "user": {"first_name": "Bob", "last_name": None},
+                        "paid_share": "0.00",
+                        "owed_share": f"{cost - round(cost / 2, 2):.2f}",
+                    },
+                ],
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def make_questions(data: pd.DataFrame, n_per_type: int = 60) -> list:
+    """
+    Sample questions of each type with the descriptions of the expenses that
+    answer them
+    """
+    data = data.assign(
+        cost=data["cost"].astype(float), category=data["category"].str.lower()
+    )
+    rng = np.random.default_rng(1)
+    groups = {
+        "month": ["year", "month", "category"],
+        "day": ["year", "month", "day", "category"],
+        "description": ["description"],
+    }
+    questions = []
+    for question_type, columns in groups.items():
+        grouped = list(data.groupby(columns))
+        for i in rng.permutation(len(grouped))[:n_per_type]:
+            key, expenses = grouped[i]
+            fields = dict(zip(columns, key))
+            if question_type == "month":
+                query = f"how much was spent on {fields['category']} in "
+                query += f"{fields['month']} {fields['year']}"
+            elif question_type == "day":
+                query = f"how much was spent on {fields['category']} on "
+                query += f"{fields['day']} {fields['month']} {fields['year']}"
+            else:
+                query = f"how much did {fields['description']} cost"
+            questions.append(
+                {
+                    "type": question_type,
+                    "query": query,
+                    "fields": fields,
+                    "expenses": set(expenses["description"].str.lower()),
+                    "total": round(expenses["cost"].sum(), 2),
+                }
+            )
+    return questions
+
+
+def question_filter(question: dict, strategy: str):
+    """
+    Metadata filter a self-query retriever would build for the strategy
+    """
+    fields = question["fields"]
+    if question["type"] == "description":
+        return None
+    conditions = [
+        {"month": {"$eq": fields["month"]}},
+        {"year": {"$eq": fields["year"]}},
+        {"category": {"$eq": fields["category"]}},
+    ]
+    if question["type"] == "day":
+        if strategy in ("expense", "day"):
+            conditions.append({"day": {"$eq": fields["day"]}})
+        else:
+            conditions.append({"first_day": {"$lte": fields["day"]}})
+            conditions.append({"last_day": {"$gte": fields["day"]}})
+    return {"$and": conditions}
+
+
+def read_expenses(documents: list) -> dict:
+    """
+    Parse the retrieved documents into expenses keyed by description
+    """
+    expenses = {}
+    for doc in documents:
+        for line in doc.page_content.split("\n"):
+            description = DESCRIPTION_PATTERN.search(line)
+            if not description:
+                continue
+            day = DAY_PATTERN.search(line)
+            expenses[description.group(1)] = {
+                "day": int(day.group(1)) if day else doc.metadata.get("day"),
+                "month": doc.metadata["month"],
+                "year": doc.metadata["year"],
+                "category": doc.metadata["category"],
+                "cost": float(COST_PATTERN.search(line).group(1)),
+            }
+    return expenses
+
+
+def oracle_answer(expenses: dict, question: dict) -> float:
+    """
+    Sum the cost of every retrieved expense matching the question
+    """
+    total = 0.0
+    for description, expense in expenses.items():
+        expense = {**expense, "description": description}
+        if all(expense[key] == value for key, value in question["fields"].items()):
+            total += expense["cost"]
+    return round(total, 2)
+
+
+def run_benchmark(content_list, metadata, questions, strategy, max_chunk_size):
+    """
+    Chunk, index and query with one strategy
+    """
+    embeddings = HashingEmbeddings()
+    start = time.perf_counter()
+    chunk_contents, chunk_metadata = chunk_expenses(
+        content_list, metadata, strategy=strategy, max_chunk_size=max_chunk_size
+    )
+    documents = [
+        Document(page_content=content.lower(), metadata=chunk_metadata[i])
+        for i, content in enumerate(chunk_contents)
+    ]
+    store = NumpyVectorStore.from_documents(documents, embeddings)
+    build_time = time.perf_counter() - start
+
+    results = {
+        question_type: {"latency": [], "payload": [], "recall": [], "correct": []}
+        for question_type in QUESTION_TYPES
+    }
+    for question in questions:
+        start = time.perf_counter()
+        retrieved = store.similarity_search(
+            question["query"], k=TOP_K, filter=question_filter(question, strategy)
+        )
+        result = results[question["type"]]
+        result["latency"].append(time.perf_counter() - start)
+        result["payload"].append(sum(len(doc.page_content) for doc in retrieved))
+        expenses = read_expenses(retrieved)
+        found = question["expenses"] & set(expenses)
+        result["recall"].append(len(found) / len(question["expenses"]))
+        answer = oracle_answer(expenses, question)
+        result["correct"].append(abs(answer - question["total"]) < 0.01)
+
+    return {
+        "strategy": f"{strategy}/{max_chunk_size}" if max_chunk_size else strategy,
+        "n_docs": len(documents),
+        "build_s": build_time,
+        "by_type": {
+            question_type: {
+                "p50_ms": np.percentile(result["latency"], 50) * 1e3,
+                "payload_chars": np.mean(result["payload"]),
+                "recall": np.mean(result["recall"]),
+                "accuracy": np.mean(result["correct"]),
+            }
+            for question_type, result in results.items()
+        },
+    }
+
+
+# %%
+if __name__ == "__main__":
+    data, content_list, metadata = clean_data(
+        make_expenses(N_EXPENSES),
+        ["description", "cost", "currency_code", "date", "category", "users"],
+    )
+    questions = make_questions(data)
+    print(f"{N_EXPENSES} expenses, {len(questions)} questions, top {TOP_K} documents")
+    print(
+        f"{'strategy':<20}{'docs':>6}{'build s':>9}  {'question':<12}"
+        f"{'p50 ms':>8}{'payload':>9}{'recall':>8}{'accuracy':>10}"
+    )
+    for strategy, max_chunk_size in STRATEGIES:
+        result = run_benchmark(
+            content_list, metadata, questions, strategy, max_chunk_size
+        )
+        for i, (question_type, scores) in enumerate(result["by_type"].items()):
+            prefix = (
+                f"{result['strategy']:<20}{result['n_docs']:>6}"
+                f"{result['build_s']:>9.3f}"
+                if i == 0
+                else " " * 35
+            )
+            print(
+                f"{prefix}  {question_type:<12}{scores['p50_ms']:>8.2f}"
+                f"{scores['payload_chars']:>9.0f}{scores['recall']:>8.3f}"
+                f"{scores['accuracy']:>10.3f}"
+            )
@@ -12,14 +12,17 @@ __version__ = "0.1"
 
 # %% --------------------------------------------------------------------------
 # Import Modules
+import uuid
+
 from src.chatbot import ChatbotWorkflow
 chatbot = ChatbotWorkflow(50024800)
+thread_id = uuid.uuid4().hex
 
 # %%
 input_message = ""
 while input_message != "Exit":
     input_message = input("Enter your message: ")
-    output = chatbot.stream(input_message)
+    output = chatbot.stream(input_message, thread_id)
     print(output)
 
 # %%
@@ -0,0 +1,189 @@
+"""
+Vector store benchmark
+
+Compare build time, query latency, recall and memory of the Chroma and NumPy
+vector store backends on synthetic expense documents at several corpus sizes.
+Each run is executed in a fresh process so resident memory is not shared.
+
+Usage: python workflows/vector_store_benchmark.py
+"""
+
+__date__ = "2025-03-10"
+__author__ = "NedeeshaWeerasuriya"
+__version__ = "0.1"
+
+
+# %% --------------------------------------------------------------------------
+# Import Modules
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from vector_store import build_vector_store  # noqa: E402
+
+CORPUS_SIZES = [500, 2000, 5000]
+N_QUERIES = 50
+TOP_K = 10
+DIMENSION = 768
+BACKENDS = {
+    "chroma": {"backend": "chroma", "collection_metadata": {"hnsw:space": "cosine"}},
+    "numpy": {"backend": "numpy"},
+    "numpy-int8": {"backend": "numpy", "quantize": True},
+    "numpy-int8-mmap": {"backend": "numpy", "quantize": True, "persist_path": True},
+}
+MONTHS = ["January", "February", "March", "April", "May", "June"]
+CATEGORIES = ["groceries", "dining out", "transport", "utilities", "rent"]
+
+
+class SyntheticEmbeddings(Embeddings):
+    """
+    Deterministic random embeddings so no model download is needed.
+    Results are cached so repeated calls cost nothing
+    """
+
+    def __init__(self, dimension: int = DIMENSION):
+        self.dimension = dimension
+        self._cache = {}
+
+    def _embed(self, text: str) -> list:
+        if text not in self._cache:
+            rng = np.random.default_rng(zlib.crc32(text.encode()))
+            self._cache[text] = (
+                rng.standard_normal(self.dimension).astype(np.float32).tolist()
+            )
+        return self._cache[text]
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._embed(text)
+
+
+def make_documents(n_docs: int) -> list:
+    """
+    Create synthetic expense documents with metadata
+    """
+    rng = np.random.default_rng(0)
+    return [
+        Document(
+            page_content=f"description: expense {i} || total cost of item: "
+            f"{rng.uniform(1, 200):.2f} gbp",
+            metadata={
+                "type": "individual",
+                "day": int(rng.integers(1, 29)),
+                "month": MONTHS[i % len(MONTHS)],
+                "year": 2024,
+                "category": CATEGORIES[i % len(CATEGORIES)],
+            },
+        )
+        for i in range(n_docs)
+    ]
+
+
+def current_rss_mb() -> float:
+    """
+    Resident set size of this process in MB
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        # ru_maxrss is the peak in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def exact_top_k(documents: list, embeddings: Embeddings, queries: list) -> list:
+    """
+    Ground truth top-k document contents using float64 brute force
+    """
+    vectors = np.array(
+        embeddings.embed_documents([doc.page_content for doc in documents])
+    )
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    truth = []
+    for query in queries:
+        query_vector = np.array(embeddings.embed_query(query))
+        scores = vectors @ (query_vector / np.linalg.norm(query_vector))
+        top = np.argsort(-scores)[:TOP_K]
+        truth.append({documents[i].page_content for i in top})
+    return truth
+
+
+def run_benchmark(name: str, n_docs: int) -> dict:
+    """
+    Build one backend at one corpus size and measure it
+    """
+    embeddings = SyntheticEmbeddings()
+    documents = make_documents(n_docs)
+    queries = [f"how much was spent on query {i}" for i in range(N_QUERIES)]
+    # also warms the embedding cache so build time measures indexing only
+    truth = exact_top_k(documents, embeddings, queries)
+
+    kwargs = dict(BACKENDS[name])
+    backend = kwargs.pop("backend")
+    temp_dir = tempfile.TemporaryDirectory()
+    if kwargs.get("persist_path"):
+        kwargs["persist_path"] = temp_dir.name
+
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    store = build_vector_store(documents, embeddings, backend=backend, **kwargs)
+    build_time = time.perf_counter() - start
+    rss_after = current_rss_mb()
+
+    latencies = []
+    recalls = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = store.similarity_search(
+            query, k=TOP_K, filter={"year": {"$eq": 2024}}
+        )
+        latencies.append(time.perf_counter() - start)
+        found = {doc.page_content for doc in results}
+        recalls.append(len(found & expected) / TOP_K)
+    temp_dir.cleanup()
+
+    return {
+        "backend": name,
+        "n_docs": n_docs,
+        "build_s": build_time,
+        "p50_ms": np.percentile(latencies, 50) * 1e3,
+        "p99_ms": np.percentile(latencies, 99) * 1e3,
+        "recall": float(np.mean(recalls)),
+        "rss_mb": rss_after - rss_before,
+    }
+
+
+def _run_in_subprocess(args: tuple) -> dict:
+    return run_benchmark(*args)
+
+
+# %%
+if __name__ == "__main__":
+    context = multiprocessing.get_context("spawn")
+    print(
+        f"{'backend':<18}{'docs':>7}{'build s':>10}{'p50 ms':>9}"
+        f"{'p99 ms':>9}{'recall':>8}{'rss MB':>9}"
+    )
+    for n_docs in CORPUS_SIZES:
+        for name in BACKENDS:
+            with context.Pool(1) as pool:
+                result = pool.apply(_run_in_subprocess, ((name, n_docs),))
+            print(
+                f"{result['backend']:<18}{result['n_docs']:>7}"
+                f"{result['build_s']:>10.3f}{result['p50_ms']:>9.2f}"
+                f"{result['p99_ms']:>9.2f}{result['recall']:>8.3f}"
+                f"{result['rss_mb']:>9.1f}"
+            )